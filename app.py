@@ -1,60 +1,213 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import List
+import asyncio
 import os
-import requests
-import time
+import httpx
 import re
+import time
 from urllib.parse import urlparse
 import hashlib
 import tempfile
+import threading
 
 from dotenv import load_dotenv
 import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from db_config import migrate_schema
 
 try:
     import psycopg2
+    import psycopg2.pool
+    from psycopg2.extras import execute_values
 except Exception:
     psycopg2 = None
 
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 except Exception:
-    webdriver = None
+    async_playwright = None
 
 try:
-    from bs4 import BeautifulSoup
+    import xxhash
 except Exception:
-    BeautifulSoup = None
+    xxhash = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except Exception:
+    LexborHTMLParser = None
 
 try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
+    from bs4 import BeautifulSoup, SoupStrainer
 except Exception:
-    SimpleDocTemplate = None
+    BeautifulSoup = None
+
+# Prefer lxml's C tokenizer for BeautifulSoup, keep html.parser for portability
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
+
+# Only materialize <body>; everything in <head> (title, meta, link, script,
+# style) is discarded anyway. lxml always synthesizes a <body>, html.parser
+# does not, so the strainer is only used with lxml.
+BODY_STRAINER = SoupStrainer('body') if BeautifulSoup and BS4_PARSER == 'lxml' else None
 
 try:
-    from PyPDF2 import PdfReader
+    import pypdfium2 as pdfium
 except Exception:
-    PdfReader = None
+    pdfium = None
 
 from starlette.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Shared async HTTP client so uploads/downloads don't block the event loop
+    # and repeated calls (e.g. Supabase uploads) reuse pooled keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        timeout=60,
+        # limits belong on the transport: the client ignores its own limits
+        # argument when an explicit transport is given
+        transport=httpx.AsyncHTTPTransport(
+            retries=3,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        ),
+        headers={'User-Agent': BROWSER_USER_AGENT},
+        follow_redirects=True,
+    )
+
+    # Shared browser, launched on first use by get_browser() and reused
+    # across requests; each URL still gets its own isolated context
+    app.state.playwright = None
+    app.state.browser = None
+    app.state.browser_lock = asyncio.Lock()
+    # Bounds concurrently open browser contexts across all requests
+    app.state.render_semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+
+    # In-memory scrape job registry, keyed by job id
+    app.state.scrape_jobs = {}
+
+    # Shared database connection pool; the schema check runs once when it is
+    # created rather than on every insert. Created eagerly here, and retried
+    # lazily by get_db_pool() if the database was unreachable at startup
+    app.state.db_pool = None
+    app.state.db_pool_lock = threading.Lock()
+    # ThreadedConnectionPool raises instead of waiting when all connections
+    # are out; worker threads wait for a free slot here instead
+    app.state.db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
+    await asyncio.to_thread(get_db_pool)
+
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        if app.state.browser is not None:
+            await app.state.browser.close()
+        if app.state.playwright is not None:
+            await app.state.playwright.stop()
+        if app.state.db_pool:
+            app.state.db_pool.closeall()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Load environment variables from .env if present
 load_dotenv()
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
+# Storage endpoints and auth headers, built once rather than per upload
+SUPABASE_BASE_URL = SUPABASE_URL.rstrip('/') if SUPABASE_URL else None
+SUPABASE_OBJECT_URL = f"{SUPABASE_BASE_URL}/storage/v1/object"
+SUPABASE_PUBLIC_URL = f"{SUPABASE_BASE_URL}/storage/v1/object/public"
+SUPABASE_HEADERS = {'Authorization': f'Bearer {SUPABASE_KEY}', 'apiKey': SUPABASE_KEY} if SUPABASE_KEY else {}
 DATABASE_URL = os.getenv('DATABASE_URL')
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', '8'))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX_CONNECTIONS', '10'))
+# How long finished scrape jobs stay queryable, in seconds
+SCRAPE_JOB_TTL = int(os.getenv('SCRAPE_JOB_TTL', '3600'))
+
+# Realistic browser fingerprint to avoid WAF detection
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-extensions",
+]
+
+# Elements that never contribute to extracted content
+UNWANTED_TAGS = (
+    'script', 'style', 'nav', 'header', 'footer',
+    'aside', 'iframe', 'img', 'video', 'audio',
+    'form', 'button', 'input', 'select', 'textarea',
+    'noscript', 'meta', 'link', 'title',
+)
+# Elements with unwanted classes/IDs (ads, navigation, etc.)
+UNWANTED_SELECTORS = (
+    '[class*="ad"]', '[class*="advertisement"]', '[class*="banner"]',
+    '[class*="popup"]', '[class*="modal"]', '[class*="sidebar"]',
+    '[class*="menu"]', '[class*="navigation"]', '[class*="nav"]',
+    '[class*="header"]', '[class*="footer"]', '[class*="social"]',
+    '[class*="share"]', '[class*="comment"]', '[class*="related"]',
+    '[id*="ad"]', '[id*="advertisement"]', '[id*="banner"]',
+    '[id*="popup"]', '[id*="modal"]', '[id*="sidebar"]',
+    '[id*="menu"]', '[id*="navigation"]', '[id*="nav"]',
+    '[id*="header"]', '[id*="footer"]',
+)
+# Important content elements, including tables
+CONTENT_TAGS = (
+    'p', 'div', 'section', 'article', 'main',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+    'li', 'ul', 'ol', 'blockquote', 'pre', 'code',
+)
+# Inline elements used when no content elements yield text
+FALLBACK_TAGS = ('span', 'a', 'strong', 'em', 'b', 'i')
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+TABLE_CELL_TAGS = frozenset(('th', 'td'))
+
+# Combined CSS selectors so each is matched in a single traversal
+UNWANTED_CSS = ', '.join(UNWANTED_TAGS + UNWANTED_SELECTORS)
+CONTENT_CSS = ', '.join(CONTENT_TAGS)
+FALLBACK_CSS = ', '.join(FALLBACK_TAGS)
+
+PUNCTUATION_ONLY_RE = re.compile(r'^[\s\W]*$')
+
+# A plain HTTP fetch is kept if it yields at least this much text and the HTML
+# doesn't look like a JavaScript app shell or bot challenge page
+STATIC_MIN_TEXT_LENGTH = int(os.getenv('STATIC_MIN_TEXT_LENGTH', '500'))
+JS_SHELL_MARKERS = (
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    '<div id="__next"></div>',
+    # Interstitial-only markers; the /cdn-cgi/challenge-platform/ script path
+    # is also injected into ordinary Cloudflare-fronted pages, so it is not used
+    'cf-browser-verification',
+    'id="challenge-form"',
+    '<title>Just a moment...</title>',
+)
+
+# Rendered (tag, innerText) pairs for the content elements inside the page's
+# main content region, skipping anything inside an unwanted element, so the
+# text goes through the same labelling and dedup as the HTML extractors
+MAIN_CONTENT_JS = """([contentSelector, unwantedSelector]) => {
+    const main = document.querySelector('main, article, [role="main"]');
+    if (!main) return [];
+    return [main, ...main.querySelectorAll(contentSelector)]
+        .filter(el => el.matches(contentSelector) && !el.closest(unwantedSelector))
+        .map(el => [el.tagName.toLowerCase(), el.innerText]);
+}"""
+# Rendered main-content text is used directly, without re-parsing the page
+# HTML, once it yields at least this much cleaned text
+RENDERED_MIN_TEXT_LENGTH = int(os.getenv('RENDERED_MIN_TEXT_LENGTH', '500'))
+
 
 
 class ScrapeRequest(BaseModel):
@@ -66,6 +219,94 @@ class ProcessDocumentRequest(BaseModel):
     document_id: str
 
 
+def _label_content(tag, text):
+    """Apply the content filters to an element's text and return the (possibly
+    labelled) text to keep, or None if the element should be skipped."""
+    if not text:
+        return None
+    text_lower = text.lower()
+    # More lenient filtering - include headings and table cells that might be shorter
+    if not (len(text.strip()) > 2 and  # Very minimal length filter
+            not PUNCTUATION_ONLY_RE.match(text) and  # Not just whitespace/punctuation
+            'cookie' not in text_lower and  # Skip cookie notices
+            'subscribe' not in text_lower[:30]):  # Skip subscription prompts
+        return None
+
+    # For headings, always include them regardless of length
+    if tag in HEADING_TAGS:
+        return f"[HEADING] {text}"
+    # For table cells, include them with lower word requirement
+    elif tag in TABLE_CELL_TAGS:
+        if len(text.split()) >= 1:  # At least 1 word for table cells
+            return f"[TABLE] {text}"
+    # For other elements, use moderate filtering
+    elif len(text.split()) >= 2:  # At least 2 words for other content
+        return text
+    return None
+
+
+def _extract_with_selectolax(html_content):
+    """Collect labelled content text using the lexbor-backed selectolax parser."""
+    tree = LexborHTMLParser(html_content)
+
+    # Remove unwanted tags and ad/navigation containers in a single traversal.
+    # Nodes come back in document order, so decompose in reverse to drop
+    # descendants before their ancestors.
+    unwanted = tree.css(UNWANTED_CSS)
+    # The root itself can match (e.g. Modernizr's "borderradius" class hits
+    # [class*="ad"]); it cannot be decomposed, and removing it leaves nothing,
+    # which is what the BeautifulSoup path returns
+    if unwanted and unwanted[0].tag == 'html':
+        return []
+    for node in reversed(unwanted):
+        node.decompose()
+
+    text_content = []
+    for node in tree.css(CONTENT_CSS):
+        labelled = _label_content(node.tag, node.text(separator=' ', strip=True))
+        if labelled:
+            text_content.append(labelled)
+
+    # If no content found in main elements, try to get any meaningful text from other elements
+    if not text_content:
+        body = tree.body or tree.root
+        if body is not None:
+            for node in body.css(FALLBACK_CSS):
+                text = node.text(strip=True)
+                if text and len(text) > 5 and len(text.split()) >= 1:
+                    text_content.append(text)
+
+    return text_content
+
+
+def _extract_with_bs4(html_content):
+    """Collect labelled content text using BeautifulSoup."""
+    soup = BeautifulSoup(html_content, BS4_PARSER, parse_only=BODY_STRAINER)
+    
+    # Remove unwanted tags and ad/navigation containers in a single traversal,
+    # descendants before their ancestors
+    for element in reversed(soup.select(UNWANTED_CSS)):
+        element.decompose()
+    
+    text_content = []
+    for element in soup.find_all(CONTENT_TAGS):
+        # Get text from the element, excluding any nested unwanted content
+        labelled = _label_content(element.name, element.get_text(separator=' ', strip=True))
+        if labelled:
+            text_content.append(labelled)
+    
+    # If no content found in main elements, try to get any meaningful text from other elements
+    if not text_content:
+        # Fallback to other content elements
+        body = soup.find('body') or soup
+        for element in body.find_all(FALLBACK_TAGS):
+            text = element.get_text(strip=True)
+            if text and len(text) > 5 and len(text.split()) >= 1:
+                text_content.append(text)
+
+    return text_content
+
+
 def extract_clean_text(html_content, url):
     """Extract comprehensive text content from HTML, including:
     - Paragraphs (<p>)
@@ -79,172 +320,68 @@ def extract_clean_text(html_content, url):
     - Quotes and code (<blockquote>, <pre>, <code>)
     
     Filters out navigation, ads, images, scripts, and other non-content elements.
+    Uses selectolax (lexbor) when installed, falling back to BeautifulSoup.
     """
-    if not BeautifulSoup:
-        return "BeautifulSoup not available for text extraction"
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove unwanted elements that shouldn't contribute to content
-    unwanted_tags = [
-        'script', 'style', 'nav', 'header', 'footer', 
-        'aside', 'iframe', 'img', 'video', 'audio',
-        'form', 'button', 'input', 'select', 'textarea',
-        'noscript', 'meta', 'link', 'title'
-    ]
-    
-    # Remove by tag
-    for tag in unwanted_tags:
-        for element in soup.find_all(tag):
-            element.decompose()
-    
-    # Remove elements with unwanted classes/IDs (ads, navigation, etc.)
-    unwanted_selectors = [
-        '[class*="ad"]', '[class*="advertisement"]', '[class*="banner"]',
-        '[class*="popup"]', '[class*="modal"]', '[class*="sidebar"]',
-        '[class*="menu"]', '[class*="navigation"]', '[class*="nav"]',
-        '[class*="header"]', '[class*="footer"]', '[class*="social"]',
-        '[class*="share"]', '[class*="comment"]', '[class*="related"]',
-        '[id*="ad"]', '[id*="advertisement"]', '[id*="banner"]',
-        '[id*="popup"]', '[id*="modal"]', '[id*="sidebar"]',
-        '[id*="menu"]', '[id*="navigation"]', '[id*="nav"]',
-        '[id*="header"]', '[id*="footer"]'
-    ]
-    
-    for selector in unwanted_selectors:
-        for element in soup.select(selector):
-            element.decompose()
-    
-    # Extract text from all important content elements including tables
-    content_elements = soup.find_all([
-        'p', 'div', 'section', 'article', 'main',
-        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-        'table', 'thead', 'tbody', 'tr', 'th', 'td',
-        'li', 'ul', 'ol', 'blockquote', 'pre', 'code'
-    ])
-    text_content = []
-    
-    for element in content_elements:
-        # Get text from the element, excluding any nested unwanted content
-        text = element.get_text(separator=' ', strip=True)
-        
-        # More lenient filtering - include headings and table cells that might be shorter
-        if (text and 
-            len(text.strip()) > 2 and  # Very minimal length filter
-            not re.match(r'^[\s\W]*$', text) and  # Not just whitespace/punctuation
-            'cookie' not in text.lower() and  # Skip cookie notices
-            'subscribe' not in text.lower()[:30]):  # Skip subscription prompts
-            
-            # For headings, always include them regardless of length
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                text_content.append(f"[HEADING] {text}")
-            # For table cells, include them with lower word requirement
-            elif element.name in ['th', 'td']:
-                if len(text.split()) >= 1:  # At least 1 word for table cells
-                    text_content.append(f"[TABLE] {text}")
-            # For other elements, use moderate filtering
-            elif len(text.split()) >= 2:  # At least 2 words for other content
-                text_content.append(text)
-    
-    # If no content found in main elements, try to get any meaningful text from other elements
-    if not text_content:
-        # Fallback to other content elements
-        body = soup.find('body') or soup
-        for element in body.find_all(['span', 'a', 'strong', 'em', 'b', 'i']):
-            text = element.get_text(strip=True)
-            if text and len(text) > 5 and len(text.split()) >= 1:
-                text_content.append(text)
+    if LexborHTMLParser:
+        text_content = _extract_with_selectolax(html_content)
+    elif BeautifulSoup:
+        text_content = _extract_with_bs4(html_content)
+    else:
+        return "No HTML parser available for text extraction (install selectolax or beautifulsoup4)"
     
-    # Remove duplicates while preserving order and clean up content
+    return _dedupe_content(text_content)
+
+
+def _dedupe_content(text_content):
+    """Normalize whitespace, drop near-empty and duplicate entries (keeping the
+    first occurrence) and join the rest into the stored document text."""
+    # With xxhash, only 64-bit fingerprints are kept in the seen set.
     seen = set()
     unique_content = []
     for text in text_content:
         # Clean up text and remove extra whitespace
         clean_text = ' '.join(text.split())
-        if clean_text not in seen and len(clean_text.strip()) > 2:
-            seen.add(clean_text)
+        if len(clean_text) <= 2:
+            continue
+        fingerprint = xxhash.xxh3_64_intdigest(clean_text.encode()) if xxhash else clean_text
+        if fingerprint not in seen:
+            seen.add(fingerprint)
             unique_content.append(clean_text)
     
     return '\n\n'.join(unique_content)
 
 
-def create_pdf_from_text(text_content, pdf_path, url, project_id):
-    """Create a PDF file from extracted text content"""
-    if not SimpleDocTemplate:
-        # Fallback to text file if reportlab not available
-        # write to a temporary file, then upload to Supabase if configured
-        with tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8', suffix='.txt') as tf:
-            tf.write(text_content)
-            temp_path = tf.name
+def write_text_file(text_content):
+    """Write extracted text to a temporary .txt file and return its path.
+    Use `publish_file` to upload or keep the result."""
+    with tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8', suffix='.txt') as tf:
+        tf.write(text_content)
+        return tf.name
 
-        if SUPABASE_URL and SUPABASE_KEY and SUPABASE_BUCKET:
-            dest_name = os.path.basename(pdf_path).replace('.pdf', '.txt')
-            uploaded = upload_to_supabase(temp_path, SUPABASE_BUCKET, dest_name)
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-            return uploaded
-        return temp_path
-    
-    # Create PDF in a temporary file then upload to Supabase
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tf:
-        temp_pdf_path = tf.name
-    doc = SimpleDocTemplate(temp_pdf_path, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-    )
-    
-    # Add title
-    story.append(Paragraph(f"Web Content Extraction", title_style))
-    story.append(Paragraph(f"URL: {url}", styles['Normal']))
-    story.append(Paragraph(f"Project: {project_id}", styles['Normal']))
-    story.append(Paragraph(f"Extracted: {time.strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Split content into paragraphs and add to PDF
-    paragraphs = text_content.split('\\n\\n')
-    
-    for para in paragraphs:
-        if para.strip():
-            # Clean text for PDF (remove problematic characters)
-            clean_para = para.replace('\\n', ' ').strip()
-            if len(clean_para) > 10:  # Only add substantial content
-                story.append(Paragraph(clean_para, styles['Normal']))
-                story.append(Spacer(1, 12))
-    
-    # Build PDF
-    doc.build(story)
 
-    # If Supabase configured, upload and remove temp file
-    if SUPABASE_URL and SUPABASE_KEY and SUPABASE_BUCKET:
-        dest_name = os.path.basename(pdf_path)
-        uploaded_url = upload_to_supabase(temp_pdf_path, SUPABASE_BUCKET, dest_name)
-        try:
-            os.remove(temp_pdf_path)
-        except:
-            pass
-        return uploaded_url
+async def publish_file(temp_path, file_name):
+    """Upload a file to Supabase as `file_name` if configured, removing the
+    temporary file. Returns the public URL, or the local path if Supabase is
+    not configured."""
+    if not (SUPABASE_URL and SUPABASE_KEY and SUPABASE_BUCKET):
+        return temp_path
 
-    # Otherwise, save to the provided path locally
+    uploaded_url = await upload_to_supabase(temp_path, SUPABASE_BUCKET, file_name)
     try:
-        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-        os.replace(temp_pdf_path, pdf_path)
-    except Exception:
-        # If replace fails, leave temp file and return its path
-        return temp_pdf_path
+        os.remove(temp_path)
+    except:
+        pass
+    return uploaded_url
 
-    return pdf_path
+
+async def _iter_file(file_path, chunk_size=64 * 1024):
+    """Yield a file's contents in chunks, for streaming request bodies."""
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
 
 
-def upload_to_supabase(file_path, bucket, dest_path):
+async def upload_to_supabase(file_path, bucket, dest_path):
     """Upload a file to Supabase Storage using the REST endpoint.
     Requires SUPABASE_URL and SUPABASE_KEY environment variables.
     Returns the public URL (assumes the bucket or object is public),
@@ -255,78 +392,104 @@ def upload_to_supabase(file_path, bucket, dest_path):
 
     # Ensure dest_path has no leading slash
     dest_path = dest_path.lstrip('/')
-    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{dest_path}"
-
-    headers = {
-        'Authorization': f'Bearer {SUPABASE_KEY}',
-        'apiKey': SUPABASE_KEY
-    }
-
-    with open(file_path, 'rb') as f:
-        data = f.read()
+    url = f"{SUPABASE_OBJECT_URL}/{bucket}/{dest_path}"
 
-    resp = requests.put(url, data=data, headers=headers, timeout=60)
+    # Stream the file in chunks so large files are never fully held in memory
+    headers = {**SUPABASE_HEADERS, 'Content-Length': str(os.path.getsize(file_path))}
+    resp = await app.state.http.put(url, content=_iter_file(file_path), headers=headers)
     if resp.status_code in (200, 201, 204):
         # Return the public object URL (common Supabase pattern)
-        public_url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{bucket}/{dest_path}"
-        return public_url
+        return f"{SUPABASE_PUBLIC_URL}/{bucket}/{dest_path}"
     else:
         # Return raw response text on failure to help debugging
         return f"upload_failed: {resp.status_code} {resp.text}"
 
 
-def insert_document_record(project_id, filename, file_path, source='scrape', status='pending', document_content=None):
-    """Insert a document record into the documents table. Creates the table if it does not exist."""
-    if not psycopg2:
-        print("[DB INSERT] psycopg2 not available")
-        return None
-    
-    if not DATABASE_URL:
-        print("[DB INSERT] DATABASE_URL not configured")
+def create_db_pool():
+    """Create the shared connection pool and make sure the documents table exists.
+    Uses the migration's own DDL so a service that starts before the migration
+    still gets the partitioned table; a failed schema check does not stop the
+    pool from being used."""
+    pool = psycopg2.pool.ThreadedConnectionPool(1, DB_POOL_MAX_CONNECTIONS, DATABASE_URL)
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            migrate_schema(cur)
+        conn.commit()
+    except psycopg2.Error as e:
+        # e.g. no CREATE permission on the schema; the table may still exist
+        # (created by the migration), so keep the pool usable
+        conn.rollback()
+        print(f"[DB] Schema check failed, continuing without it: {type(e).__name__}: {str(e)}")
+    finally:
+        pool.putconn(conn)
+    return pool
+
+
+def get_db_pool():
+    """Return the shared connection pool, creating it on first use. A failed
+    attempt (e.g. database down at boot) is retried on the next call. Returns
+    None when the database is not configured or still unreachable."""
+    if app.state.db_pool is None and psycopg2 and DATABASE_URL:
+        with app.state.db_pool_lock:
+            if app.state.db_pool is None:
+                try:
+                    app.state.db_pool = create_db_pool()
+                except Exception as e:
+                    print(f"[DB] Failed to initialize connection pool: {type(e).__name__}: {str(e)}")
+    return app.state.db_pool
+
+
+@contextmanager
+def db_connection():
+    """Borrow a connection from the shared pool and return it when done,
+    waiting for a free one if all are in use. The pool rolls back any
+    transaction left open on return."""
+    pool = app.state.db_pool
+    with app.state.db_pool_slots:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn)
+
+
+def insert_document_records(records):
+    """Insert document records into the documents table with a single statement.
+    Each record is a (project_id, filename, file_path, source, status, document_content)
+    tuple. Returns the list of new document ids in the same order, or None on failure."""
+    if not get_db_pool():
+        print("[DB INSERT] Database not configured")
         return None
 
     try:
-        print(f"[DB INSERT] Connecting to database...")
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        print(f"[DB INSERT] Creating table if not exists...")
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS documents (
-            id UUID PRIMARY KEY,
-            project_id TEXT,
-            filename TEXT,
-            file_path TEXT,
-            source TEXT,
-            status TEXT DEFAULT 'pending',
-            document_content TEXT
-        )
-        """)
-
-        doc_id = uuid.uuid4()
-        print(f"[DB INSERT] Inserting document record with id={doc_id}")
-        cur.execute(
-            "INSERT INTO documents (id, project_id, filename, file_path, source, status, document_content) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-            (str(doc_id), project_id if project_id else None, filename, file_path, source, status, document_content)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
-        print(f"[DB INSERT] Successfully inserted document with id={doc_id}")
-        return str(doc_id)
+        doc_ids = [str(uuid.uuid4()) for _ in records]
+        rows = [
+            # project_id is part of the primary key (partition key), so it
+            # cannot be NULL; an empty string stands for "no project"
+            (doc_id, project_id or '', filename, file_path, source, status, document_content)
+            for doc_id, (project_id, filename, file_path, source, status, document_content) in zip(doc_ids, records)
+        ]
+        print(f"[DB INSERT] Inserting {len(rows)} document record(s)")
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    "INSERT INTO documents (id, project_id, filename, file_path, source, status, document_content) VALUES %s",
+                    rows
+                )
+            conn.commit()
+        print(f"[DB INSERT] Successfully inserted ids={doc_ids}")
+        return doc_ids
     except Exception as e:
         print(f"[DB INSERT] Error during insert: {type(e).__name__}: {str(e)}")
-        try:
-            conn.close()
-        except:
-            pass
         return None
 
 
-def download_pdf_from_url(url):
+async def download_pdf_from_url(url):
     """Download a PDF file from a URL and return the file path."""
     try:
-        response = requests.get(url, timeout=60)
+        response = await app.state.http.get(url)
         response.raise_for_status()
         
         # Save to temporary file
@@ -340,17 +503,21 @@ def download_pdf_from_url(url):
 
 def extract_text_from_pdf(pdf_path):
     """Extract text content from a PDF file."""
-    if not PdfReader:
+    if not pdfium:
         return None
     
     try:
-        reader = PdfReader(pdf_path)
-        text_content = []
-        
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_content.append(text)
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            text_content = []
+            
+            for page in pdf:
+                # PDFium separates lines with \r\n
+                text = page.get_textpage().get_text_range().replace('\r\n', '\n')
+                if text:
+                    text_content.append(text)
+        finally:
+            pdf.close()
         
         return '\n\n'.join(text_content)
     except Exception as e:
@@ -360,48 +527,38 @@ def extract_text_from_pdf(pdf_path):
 
 def update_document_content(document_id, content):
     """Update the document_content column for a given document_id."""
-    if not (psycopg2 and DATABASE_URL):
+    if not get_db_pool():
         return False
     
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        cur.execute(
-            "UPDATE documents SET document_content = %s, status = %s WHERE id = %s",
-            (content, 'processed', document_id)
-        )
-        conn.commit()
-        rows_updated = cur.rowcount
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE documents SET document_content = %s, status = %s WHERE id = %s",
+                    (content, 'processed', document_id)
+                )
+                rows_updated = cur.rowcount
+            conn.commit()
         
         return rows_updated > 0
     except Exception as e:
         print(f"[UPDATE CONTENT] Error: {str(e)}")
-        try:
-            conn.close()
-        except:
-            pass
         return False
 
 
 def get_document_by_id(document_id):
     """Retrieve a document record by its ID."""
-    if not (psycopg2 and DATABASE_URL):
+    if not get_db_pool():
         return None
     
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        cur.execute(
-            "SELECT id, project_id, filename, file_path, source, status, document_content FROM documents WHERE id = %s",
-            (document_id,)
-        )
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, project_id, filename, file_path, source, status, document_content FROM documents WHERE id = %s",
+                    (document_id,)
+                )
+                row = cur.fetchone()
         
         if row:
             return {
@@ -416,45 +573,52 @@ def get_document_by_id(document_id):
         return None
     except Exception as e:
         print(f"[GET DOCUMENT] Error: {str(e)}")
-        try:
-            conn.close()
-        except:
-            pass
         return None
 
 
 @app.post("/process_document")
 async def process_document(body: ProcessDocumentRequest):
     """Process a document by downloading its PDF from Supabase, extracting text, and updating the database."""
-    if not PdfReader:
-        raise HTTPException(status_code=500, detail="PyPDF2 not available. Install PyPDF2 for PDF text extraction.")
-    
     # Get document record from database
-    document = get_document_by_id(body.document_id)
+    document = await asyncio.to_thread(get_document_by_id, body.document_id)
     if not document:
         raise HTTPException(status_code=404, detail=f"Document with id {body.document_id} not found")
     
+    # Scraped pages are stored as text with their content already filled in
+    if document.get('status') == 'processed' and document.get('document_content'):
+        return JSONResponse({
+            "document_id": body.document_id,
+            "status": "processed",
+            "content_length": len(document['document_content']),
+            "message": "Document already processed"
+        })
+    
     file_path = document.get('file_path')
     if not file_path:
         raise HTTPException(status_code=400, detail="Document has no file_path")
+    if urlparse(file_path).path.lower().endswith('.txt'):
+        raise HTTPException(status_code=400, detail="Document file is plain text, not a PDF; nothing to extract")
+    
+    if not pdfium:
+        raise HTTPException(status_code=500, detail="pypdfium2 not available. Install pypdfium2 for PDF text extraction.")
     
     # Download PDF from Supabase
     print(f"[PROCESS] Downloading PDF from {file_path}")
-    local_pdf_path = download_pdf_from_url(file_path)
+    local_pdf_path = await download_pdf_from_url(file_path)
     if not local_pdf_path:
         raise HTTPException(status_code=500, detail="Failed to download PDF from Supabase")
     
     try:
         # Extract text from PDF
         print(f"[PROCESS] Extracting text from PDF")
-        extracted_text = extract_text_from_pdf(local_pdf_path)
+        extracted_text = await asyncio.to_thread(extract_text_from_pdf, local_pdf_path)
         
         if not extracted_text:
             raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
         
         # Update database with extracted content
         print(f"[PROCESS] Updating document_content in database")
-        success = update_document_content(body.document_id, extracted_text)
+        success = await asyncio.to_thread(update_document_content, body.document_id, extracted_text)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update document_content in database")
@@ -474,160 +638,289 @@ async def process_document(body: ProcessDocumentRequest):
             pass
 
 
-@app.post("/scrape")
-async def scrape(body: ScrapeRequest):
-    if webdriver is None:
-        raise HTTPException(status_code=500, detail="Selenium not available. Install selenium and ensure ChromeDriver is available.")
-
-    results = []
-
-    # Setup Chrome options for headless browsing with WAF bypass
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-images")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # Add realistic user agent to bypass WAF detection
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+def build_file_name(url, project_id):
+    """Create a meaningful, filesystem-safe text filename from a URL."""
+    parsed_url = urlparse(url)
+    domain = parsed_url.netloc.replace('www.', '').replace('.', '_')
+    path = parsed_url.path.replace('/', '_').replace('.', '_')
     
-    # Remove automation indicators
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    # Remove --disable-javascript to allow dynamic content loading
+    # Create a short hash for uniqueness if path is empty or too long
+    if xxhash:
+        url_hash = xxhash.xxh3_64_hexdigest(url.encode())[:8]
+    else:
+        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
     
-    driver = None
+    if path and len(path) > 5:
+        filename_base = f"{domain}{path}"[:50]  # Limit length
+    else:
+        filename_base = f"{domain}_{url_hash}"
     
+    # Clean filename and add project prefix
+    clean_filename = re.sub(r'[^a-zA-Z0-9_-]', '_', filename_base)
+    return f"{project_id}_{clean_filename}.txt"
+
+
+async def fetch_rendered_content(browser, url):
+    """Render a URL in a fresh browser context.
+    Returns (text, None) when the page's main content region already yields
+    enough rendered text, else (None, html) with the page HTML to extract from."""
+    context = await browser.new_context(
+        user_agent=BROWSER_USER_AGENT,
+        viewport={'width': 1920, 'height': 1080},
+    )
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(30)
-        
         # Hide automation indicators
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        for idx, url in enumerate(body.urls, start=1):
-            # Create meaningful filename from URL
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc.replace('www.', '').replace('.', '_')
-            path = parsed_url.path.replace('/', '_').replace('.', '_')
-            
-            # Create a short hash for uniqueness if path is empty or too long
-            url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-            
-            if path and len(path) > 5:
-                filename_base = f"{domain}{path}"[:50]  # Limit length
-            else:
-                filename_base = f"{domain}_{url_hash}"
-            
-            # Clean filename and add project prefix
-            clean_filename = re.sub(r'[^a-zA-Z0-9_-]', '_', filename_base)
-            pdf_name = f"{body.project_id}_{clean_filename}.pdf"
-            pdf_path = pdf_name  # Just the filename, no local directory needed
-            
+        await context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        page = await context.new_page()
+
+        # Navigate to the page with retry mechanism
+        max_retries = 3
+        for attempt in range(max_retries):
             try:
-                # Navigate to the page with retry mechanism
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        driver.get(url)
-                        
-                        # Add realistic delay and user behavior simulation
-                        time.sleep(2)
-                        
-                        # Scroll to simulate user behavior
-                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-                        time.sleep(1)
-                        driver.execute_script("window.scrollTo(0, 0);")
-                        time.sleep(1)
-                        
-                        # Check if we're blocked
-                        page_title = driver.title.lower()
-                        if 'blocked' in page_title or 'forbidden' in page_title:
-                            if attempt < max_retries - 1:
-                                print(f"[SCRAPE] Detected blocking on attempt {attempt + 1}, retrying...")
-                                time.sleep(5)  # Wait before retry
-                                continue
-                        
-                        break  # Success, exit retry loop
-                        
-                    except Exception as retry_error:
-                        if attempt < max_retries - 1:
-                            print(f"[SCRAPE] Attempt {attempt + 1} failed: {retry_error}, retrying...")
-                            time.sleep(5)
-                        else:
-                            raise retry_error
+                await page.goto(url, timeout=30000, wait_until='domcontentloaded')
                 
-                # Get page source after JavaScript execution
-                html_content = driver.page_source
+                # Wait for dynamic content by waiting for the network to go
+                # quiet, rather than sleeping for a fixed time
+                try:
+                    await page.wait_for_load_state('networkidle', timeout=5000)
+                except PlaywrightTimeoutError:
+                    pass
                 
-                # Extract clean text content
-                clean_text = extract_clean_text(html_content, url)
+                # Scroll once to trigger lazy-loaded content
+                await page.evaluate("document.body && window.scrollTo(0, document.body.scrollHeight)")
+                await page.wait_for_timeout(500)
                 
-                # Create PDF from extracted text
-                created_file = create_pdf_from_text(clean_text, pdf_path, url, body.project_id)
-
-                # If uploaded to Supabase (public URL returned), insert DB record
-                document_id = None
-                if SUPABASE_URL and created_file and isinstance(created_file, str) and created_file.startswith(SUPABASE_URL.rstrip('/')):
-                    try:
-                        document_id = insert_document_record(body.project_id, pdf_name, created_file, source='scrape', status='pending', document_content=None)
-                    except Exception:
-                        document_id = None
-
-                results.append({
-                    "url": url,
-                    "pdf_file": created_file,
-                    "method": "selenium",
-                    "content_length": len(clean_text),
-                    "document_id": document_id
-                })
+                # Check if we're blocked
+                page_title = (await page.title()).lower()
+                if 'blocked' in page_title or 'forbidden' in page_title:
+                    if attempt < max_retries - 1:
+                        print(f"[SCRAPE] Detected blocking on attempt {attempt + 1}, retrying...")
+                        await asyncio.sleep(5)  # Wait before retry
+                        continue
                 
-            except Exception as e:
-                # Fallback to requests for static content
-                try:
-                    response = requests.get(url, timeout=30)
-                    response.raise_for_status()
-                    clean_text = extract_clean_text(response.text, url)
-                    
-                    # Create PDF from extracted text
-                    created_file = create_pdf_from_text(clean_text, pdf_path, url, body.project_id)
-
-                    document_id = None
-                    if SUPABASE_URL and created_file and isinstance(created_file, str) and created_file.startswith(SUPABASE_URL.rstrip('/')):
-                        try:
-                            document_id = insert_document_record(body.project_id, pdf_name, created_file, source='scrape', status='pending', document_content=None)
-                        except Exception:
-                            document_id = None
-
-                    results.append({
-                        "url": url,
-                        "pdf_file": created_file,
-                        "method": "requests_fallback",
-                        "content_length": len(clean_text),
-                        "document_id": document_id
-                    })
-                except Exception as fallback_error:
-                    # If both methods fail, create a simple error PDF
-                    try:
-                        error_content = f"Failed to scrape URL: {url} - Selenium Error: {str(e)} - Fallback Error: {str(fallback_error)}"
-                        error_pdf = create_pdf_from_text(error_content, pdf_path, url, body.project_id)
-                        results.append({"url": url, "pdf_file": error_pdf, "method": "error_pdf", "error": "Both methods failed, created error PDF"})
-                    except:
-                        results.append({"url": url, "error": f"Selenium failed: {str(e)}, Fallback failed: {str(fallback_error)}"})
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Driver initialization failed: {str(e)}")
-    
+                break  # Success, exit retry loop
+                
+            except Exception as retry_error:
+                if attempt < max_retries - 1:
+                    print(f"[SCRAPE] Attempt {attempt + 1} failed: {retry_error}, retrying...")
+                    await asyncio.sleep(5)
+                else:
+                    raise retry_error
+
+        # Prefer the browser's own rendering of the main content region,
+        # which skips serializing and re-parsing the whole DOM
+        elements = await page.evaluate(MAIN_CONTENT_JS, [CONTENT_CSS, UNWANTED_CSS])
+        labelled = (_label_content(tag, text.strip()) for tag, text in elements)
+        text = _dedupe_content([item for item in labelled if item])
+        if len(text) >= RENDERED_MIN_TEXT_LENGTH:
+            return text, None
+
+        # Get page source after JavaScript execution
+        return None, await page.content()
     finally:
-        if driver:
-            driver.quit()
-    
-    return JSONResponse({"results": results})
+        await context.close()
+
+
+async def save_scraped_text(clean_text, file_name, project_id):
+    """Upload or save extracted text. Returns (saved_file, record) where record
+    is the processed document row to insert if the file was uploaded to
+    Supabase, else None. The text is stored in the row directly, so scraped
+    documents don't need a separate /process_document pass."""
+    temp_file = await asyncio.to_thread(write_text_file, clean_text)
+    saved_file = await publish_file(temp_file, file_name)
+
+    # If uploaded to Supabase (public URL returned), a DB record should be inserted
+    record = None
+    if SUPABASE_BASE_URL and saved_file.startswith(SUPABASE_PUBLIC_URL):
+        record = (project_id, file_name, saved_file, 'scrape', 'processed', clean_text)
+    return saved_file, record
+
+
+async def probe_static(url):
+    """Fetch a URL without a browser and extract its text.
+    Returns (clean_text, needs_browser, error); clean_text is None if the fetch
+    or the extraction failed, so one bad page never fails the whole scrape."""
+    try:
+        response = await app.state.http.get(url, timeout=10)
+        response.raise_for_status()
+        html_content = response.text
+        clean_text = await asyncio.to_thread(extract_clean_text, html_content, url)
+    except Exception as e:
+        return None, True, e
+
+    needs_browser = (
+        len(clean_text) < STATIC_MIN_TEXT_LENGTH or
+        any(marker in html_content for marker in JS_SHELL_MARKERS)
+    )
+    return clean_text, needs_browser, None
+
+
+async def render_text(browser, url):
+    """Render a URL in the browser and extract its text."""
+    async with app.state.render_semaphore:
+        text, html_content = await fetch_rendered_content(browser, url)
+    if text is not None:
+        return text
+    return await asyncio.to_thread(extract_clean_text, html_content, url)
+
+
+async def get_browser():
+    """Return the shared Chromium instance, launching it on first use
+    (or again if it has crashed)."""
+    async with app.state.browser_lock:
+        browser = app.state.browser
+        if browser is not None and browser.is_connected():
+            return browser
+
+        if app.state.playwright is None:
+            app.state.playwright = await async_playwright().start()
+        app.state.browser = await app.state.playwright.chromium.launch(
+            headless=True,
+            args=BROWSER_ARGS,
+            # Remove automation indicators
+            ignore_default_args=["--enable-automation"],
+        )
+        return app.state.browser
+
+
+async def render_texts(urls):
+    """Render several URLs concurrently in the shared browser, one context per URL.
+    Returns a list of extracted texts or exceptions, in the same order."""
+    if async_playwright is None:
+        error = RuntimeError("Playwright not available. Install playwright and run `python -m playwright install chromium`.")
+        return [error] * len(urls)
+
+    try:
+        browser = await get_browser()
+    except Exception as e:
+        error = RuntimeError(f"Browser initialization failed: {str(e)}")
+        return [error] * len(urls)
+
+    return await asyncio.gather(
+        *(render_text(browser, url) for url in urls),
+        return_exceptions=True,
+    )
+
+
+async def finish_url(url, project_id, probe, rendered):
+    """Save the best text obtained for a URL, or an error file if none was.
+    Returns (result, record) where record is the document row to insert, or None."""
+    static_text, needs_browser, static_error = probe
+    file_name = build_file_name(url, project_id)
+
+    if not needs_browser:
+        clean_text, method = static_text, "static"
+    elif not isinstance(rendered, Exception):
+        clean_text, method = rendered, "playwright"
+    elif static_text is not None:
+        # Browser failed, fall back to whatever the plain HTTP fetch returned
+        clean_text, method = static_text, "requests_fallback"
+    else:
+        # If both methods fail, save a simple error file
+        try:
+            error_content = f"Failed to scrape URL: {url} - Browser Error: {str(rendered)} - Fallback Error: {str(static_error)}"
+            temp_file = await asyncio.to_thread(write_text_file, error_content)
+            error_file = await publish_file(temp_file, file_name)
+            return {"url": url, "pdf_file": error_file, "method": "error_pdf", "error": "Both methods failed, saved error file"}, None
+        except:
+            return {"url": url, "error": f"Browser failed: {str(rendered)}, Fallback failed: {str(static_error)}"}, None
+
+    saved_file, record = await save_scraped_text(clean_text, file_name, project_id)
+    return {
+        "url": url,
+        "pdf_file": saved_file,
+        "method": method,
+        "content_length": len(clean_text),
+        "document_id": None
+    }, record
+
+
+async def scrape_urls(urls, project_id):
+    """Scrape, store and record every URL. Returns the per-URL results."""
+    # Try a cheap HTTP fetch for every URL first
+    probes = await asyncio.gather(*(probe_static(url) for url in urls))
+
+    # Only start a browser for pages that look JavaScript-dependent
+    rendered = {}
+    browser_indexes = [i for i, (_, needs_browser, _) in enumerate(probes) if needs_browser]
+    if browser_indexes:
+        texts = await render_texts([urls[i] for i in browser_indexes])
+        rendered = dict(zip(browser_indexes, texts))
+
+    outcomes = await asyncio.gather(
+        *(finish_url(url, project_id, probes[i], rendered.get(i)) for i, url in enumerate(urls)),
+        return_exceptions=True,
+    )
+
+    results = []
+    pending = []  # (result, record) pairs awaiting a DB record
+    for url, outcome in zip(urls, outcomes):
+        if isinstance(outcome, Exception):
+            results.append({"url": url, "error": str(outcome)})
+            continue
+        result, record = outcome
+        results.append(result)
+        if record:
+            pending.append((result, record))
+
+    # Insert all uploaded documents in a single batch
+    if pending:
+        document_ids = await asyncio.to_thread(insert_document_records, [record for _, record in pending])
+        if document_ids:
+            for (result, _), document_id in zip(pending, document_ids):
+                result["document_id"] = document_id
+
+    return results
+
+
+async def run_scrape_job(job_id, body):
+    """Background task that runs a scrape and records its outcome on the job."""
+    job = app.state.scrape_jobs[job_id]
+    job["status"] = "running"
+    try:
+        job["results"] = await scrape_urls(body.urls, body.project_id)
+        job["status"] = "completed"
+    except Exception as e:
+        print(f"[SCRAPE JOB] {job_id} failed: {type(e).__name__}: {str(e)}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    job["finished_at"] = time.time()
+
+
+def prune_scrape_jobs():
+    """Forget finished jobs older than SCRAPE_JOB_TTL."""
+    cutoff = time.time() - SCRAPE_JOB_TTL
+    jobs = app.state.scrape_jobs
+    expired = [job_id for job_id, job in jobs.items() if job.get("finished_at") and job["finished_at"] < cutoff]
+    for job_id in expired:
+        del jobs[job_id]
+
+
+@app.post("/scrape", status_code=202)
+async def scrape(body: ScrapeRequest, background_tasks: BackgroundTasks):
+    """Queue a scrape and return immediately; poll GET /scrape/{job_id} for results."""
+    prune_scrape_jobs()
+
+    job_id = uuid.uuid4().hex
+    app.state.scrape_jobs[job_id] = {
+        "job_id": job_id,
+        "status": "pending",
+        "project_id": body.project_id,
+        "url_count": len(body.urls),
+        "results": None,
+    }
+    background_tasks.add_task(run_scrape_job, job_id, body)
+
+    return JSONResponse({"job_id": job_id, "status": "pending"}, status_code=202)
+
+
+@app.get("/scrape/{job_id}")
+async def get_scrape_job(job_id: str):
+    """Return the status of a scrape job, with its results once completed."""
+    job = app.state.scrape_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Scrape job {job_id} not found")
+    return JSONResponse({key: value for key, value in job.items() if key != "finished_at"})
 
 app.add_middleware(
     CORSMiddleware,
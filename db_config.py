@@ -0,0 +1,89 @@
+"""Connection settings and the `documents` schema shared by the service, the
+migrations and the insert test."""
+
+# TCP keepalives so idle connections behind NATs are detected instead of
+# hanging, and tcp_user_timeout (ms) bounds how long unacknowledged writes wait.
+# libpq already sets TCP_NODELAY, so small packets are not held back by Nagle.
+CONNECT_KWARGS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3,
+    'tcp_user_timeout': 10000,
+}
+
+APPLICATION_NAME = 'policy-scraper'
+
+
+def build_dsn(database_url):
+    """Parse a connection URL once into libpq keywords with the shared settings
+    merged in, for use as psycopg.connect(**dsn) or pool kwargs."""
+    from psycopg.conninfo import conninfo_to_dict
+
+    dsn = conninfo_to_dict(database_url)
+    dsn.update(CONNECT_KWARGS, application_name=APPLICATION_NAME)
+    return dsn
+
+
+# Hash-partitioned by project: concurrent loads for different projects land in
+# different heaps, and each partition's indexes stay small enough to stay
+# cached. The partition key must be part of the primary key.
+DOCUMENT_PARTITIONS = 16
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS documents (
+    id UUID,
+    project_id TEXT,
+    filename TEXT,
+    file_path TEXT,
+    source TEXT,
+    status TEXT DEFAULT 'pending',
+    document_content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id, project_id)
+) PARTITION BY HASH (project_id);
+"""
+
+# UNLOGGED skips WAL entirely: much faster writes, but the table is truncated
+# after a crash and is not replicated. Only for ephemeral test databases. It
+# applies to the partitions, which hold the data; a partitioned parent cannot
+# be UNLOGGED itself.
+CREATE_PARTITION_SQL = """
+CREATE {persistence}TABLE IF NOT EXISTS documents_p{remainder}
+    PARTITION OF documents FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder});
+"""
+
+TABLE_KIND_SQL = "SELECT relkind FROM pg_class WHERE oid = to_regclass('documents')"
+PARTITION_COUNT_SQL = "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass('documents')"
+
+
+def table_kind(cur):
+    """pg_class.relkind of `documents`: 'p' when partitioned, 'r' for a plain
+    table created before partitioning, None when it does not exist yet."""
+    cur.execute(TABLE_KIND_SQL)
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def migrate_schema(cur, unlogged=False):
+    """Create the documents table and its partitions without secondary indexes.
+    Bulk loads that run before migrate_indexes() skip per-row index
+    maintenance. All statements go in one simple-query message, which the
+    server runs as a single implicit transaction. Takes a cursor so the
+    service's psycopg2 pool and the psycopg migration run the same DDL."""
+    kind = table_kind(cur)
+    if kind == 'r':
+        print('Existing `documents` table is not partitioned; leaving it as is.')
+        return
+    # Nothing to create: skip the DDL so roles without CREATE on the schema
+    # (the PostgreSQL 15+ default for public) can still start up
+    if kind == 'p':
+        cur.execute(PARTITION_COUNT_SQL)
+        if cur.fetchone()[0] >= DOCUMENT_PARTITIONS:
+            return
+    persistence = 'UNLOGGED ' if unlogged else ''
+    partitions = ''.join(
+        CREATE_PARTITION_SQL.format(persistence=persistence, modulus=DOCUMENT_PARTITIONS, remainder=remainder)
+        for remainder in range(DOCUMENT_PARTITIONS)
+    )
+    cur.execute(CREATE_TABLE_SQL + partitions)
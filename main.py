@@ -1,96 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from typing import List
+import asyncio
 import os
-import uuid
 
 try:
-	from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+	from playwright.async_api import async_playwright
 except Exception:
 	async_playwright = None
 
 from starlette.responses import JSONResponse
 
-app = FastAPI()
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output_pdfs")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-class ScrapeRequest(BaseModel):
-	url: str
-	filename: str | None = None
-	wait_for: str | None = None
-	timeout: int | None = 30000
-
-
-@app.post("/scrape")
-async def scrape(body: ScrapeRequest):
-	if async_playwright is None:
-		raise HTTPException(status_code=500, detail="Playwright is not installed. See README to install dependencies.")
-
-	url = body.url
-	filename = body.filename or f"{uuid.uuid4().hex}.pdf"
-	pdf_path = os.path.join(OUTPUT_DIR, filename)
 
+@asynccontextmanager
+async def lifespan(app):
+	# Launch Chromium once and share it; each request only opens a cheap,
+	# isolated browser context
+	app.state.browser = None
+	app.state.browser_error = "Playwright is not installed. See README to install dependencies."
+	# Bounds concurrently open browser contexts across all requests
+	app.state.semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+	playwright = None
+	if async_playwright is not None:
+		try:
+			playwright = await async_playwright().start()
+			app.state.browser = await playwright.chromium.launch()
+		except Exception as exc:
+			app.state.browser_error = f"Browser launch failed: {exc}"
 	try:
-		async with async_playwright() as p:
-			browser = await p.chromium.launch()
-			context = await browser.new_context()
-			page = await context.new_page()
-			await page.goto(url, timeout=body.timeout, wait_until="networkidle")
-			if body.wait_for:
-				try:
-					await page.wait_for_selector(body.wait_for, timeout=body.timeout)
-				except PlaywrightTimeoutError:
-					pass
-			await page.pdf(path=pdf_path, format="A4", print_background=True)
-			from fastapi import FastAPI, HTTPException
-			from pydantic import BaseModel
-			from fastapi import FastAPI, HTTPException
-			from pydantic import BaseModel
-			from typing import List
-			from fastapi import FastAPI, HTTPException
-			from pydantic import BaseModel
-			from typing import List
-			import os
-
-			try:
-				from playwright.async_api import async_playwright
-			except Exception:
-				async_playwright = None
+		yield
+	finally:
+		if app.state.browser is not None:
+			await app.state.browser.close()
+		if playwright is not None:
+			await playwright.stop()
 
-			from starlette.responses import JSONResponse
 
-
-			app = FastAPI()
-			OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output_pdfs")
-			os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-			class ScrapeRequest(BaseModel):
-				urls: List[str]
-				project_id: str
-
-
-			@app.post("/scrape")
-			async def scrape(body: ScrapeRequest):
-				if async_playwright is None:
-					raise HTTPException(status_code=500, detail="Playwright is not installed. See README to install dependencies.")
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
-import os
-
-try:
-	from playwright.async_api import async_playwright
-except Exception:
-	async_playwright = None
-
-from starlette.responses import JSONResponse
-
-
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output_pdfs")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
 
 
 class ScrapeRequest(BaseModel):
@@ -98,61 +48,33 @@ class ScrapeRequest(BaseModel):
 	project_id: str
 
 
-@app.post("/scrape")
-async def scrape(body: ScrapeRequest):
-	if async_playwright is None:
-		raise HTTPException(status_code=500, detail="Playwright is not installed. See README to install dependencies.")
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
-import os
-
-try:
-	from playwright.async_api import async_playwright
-except Exception:
-	async_playwright = None
-
-from starlette.responses import JSONResponse
-
-
-app = FastAPI()
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output_pdfs")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-class ScrapeRequest(BaseModel):
-	urls: List[str]
-	project_id: str
+async def scrape_one(url, pdf_path):
+	async with app.state.semaphore:
+		context = await app.state.browser.new_context()
+		try:
+			page = await context.new_page()
+			await page.goto(url, timeout=30000, wait_until="networkidle")
+			await page.pdf(path=pdf_path, format="A4", print_background=True)
+			return {"url": url, "pdf": pdf_path}
+		except Exception as e:
+			return {"url": url, "error": str(e)}
+		finally:
+			await context.close()
 
 
 @app.post("/scrape")
 async def scrape(body: ScrapeRequest):
-	if async_playwright is None:
-		raise HTTPException(status_code=500, detail="Playwright is not installed. See README to install dependencies.")
+	if app.state.browser is None:
+		raise HTTPException(status_code=500, detail=app.state.browser_error)
 
 	project_dir = os.path.join(OUTPUT_DIR, body.project_id)
 	os.makedirs(project_dir, exist_ok=True)
-	results = []
 
 	try:
-		async with async_playwright() as p:
-			browser = await p.chromium.launch()
-			context = await browser.new_context()
-
-			for idx, url in enumerate(body.urls, start=1):
-				page = await context.new_page()
-				pdf_name = f"{body.project_id}_{idx}.pdf"
-				pdf_path = os.path.join(project_dir, pdf_name)
-				try:
-					await page.goto(url, timeout=30000, wait_until="networkidle")
-					await page.pdf(path=pdf_path, format="A4", print_background=True)
-					results.append({"url": url, "pdf": pdf_path})
-				except Exception as e:
-					results.append({"url": url, "error": str(e)})
-				finally:
-					await page.close()
-
-			await browser.close()
+		results = await asyncio.gather(*(
+			scrape_one(url, os.path.join(project_dir, f"{body.project_id}_{idx}.pdf"))
+			for idx, url in enumerate(body.urls, start=1)
+		))
 	except Exception as exc:
 		raise HTTPException(status_code=500, detail=str(exc))
 
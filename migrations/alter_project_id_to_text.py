@@ -4,40 +4,60 @@ import os
 import sys
 from dotenv import load_dotenv
 
+# Make the repository root importable when run as `python migrations/<script>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_config import build_dsn  # noqa: E402
+
 load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-try:
-    import psycopg2
-except Exception as e:
-    print('psycopg2 is not installed:', e)
-    sys.exit(2)
-
-if not DATABASE_URL:
-    print('DATABASE_URL is not set. Aborting.')
-    sys.exit(1)
-
 ALTER_COLUMN_SQL = """
 ALTER TABLE documents ALTER COLUMN project_id TYPE TEXT USING project_id::TEXT;
 """
 
+# Table kind ('p' = partitioned) and current project_id type. The partitioned
+# table from create_documents_table.py already has a TEXT project_id, and
+# PostgreSQL rejects altering the type of a partition key column.
+PROJECT_ID_TYPE_SQL = """
+SELECT c.relkind, format_type(a.atttypid, a.atttypmod)
+FROM pg_class c
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = 'project_id'
+WHERE c.oid = to_regclass('documents');
+"""
+
 
 def main():
+    # Imported here rather than at module level so importing this module does
+    # not pay for loading the driver
+    try:
+        import psycopg
+    except ImportError as e:
+        print('psycopg is not installed:', e)
+        sys.exit(2)
+
+    if not DATABASE_URL:
+        print('DATABASE_URL is not set. Aborting.')
+        sys.exit(1)
+
+    dsn = build_dsn(DATABASE_URL)
+
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        print('Connected to database, altering project_id column to TEXT...')
-        cur.execute(ALTER_COLUMN_SQL)
-        conn.commit()
-        cur.close()
-        conn.close()
+        # The connection block commits on success and closes either way
+        with psycopg.connect(**dsn) as conn, conn.cursor() as cur:
+            print('Connected to database, checking project_id column type...')
+            row = cur.execute(PROJECT_ID_TYPE_SQL).fetchone()
+            if row is None:
+                print('No `documents` table with a project_id column; nothing to alter.')
+                return
+            relkind, column_type = row
+            if column_type == 'text' or relkind == 'p':
+                print(f'project_id is already {column_type} (table kind {relkind!r}); nothing to alter.')
+                return
+            print('Altering project_id column to TEXT...')
+            cur.execute(ALTER_COLUMN_SQL)
         print('Migration completed: project_id column is now TEXT.')
     except Exception as e:
         print('Migration failed:', str(e))
-        try:
-            conn.close()
-        except Exception:
-            pass
         sys.exit(3)
 
 
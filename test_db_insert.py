@@ -1,49 +1,199 @@
 #!/usr/bin/env python3
-"""Quick test to verify DB connection and insert."""
+"""Quick test to verify DB connection and insert.
+
+Usage:
+    python test_db_insert.py               # single-row sanity check
+    python test_db_insert.py --bulk 10000  # also time bulk loads of N rows
+    python test_db_insert.py --bulk 10000 --asyncpg  # include asyncpg in the bulk timings
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
 import os
 import sys
+import time
 from dotenv import load_dotenv
 import uuid
 
+from db_config import build_dsn
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+log = logging.getLogger("db_test")
+
 load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL')
+# DB_DISABLE_PREPARES=1 skips named prepared statements (e.g. behind a
+# transaction-mode pgbouncer); each execute is then a single unnamed
+# Parse/Bind/Execute flight
+DB_DISABLE_PREPARES = os.getenv('DB_DISABLE_PREPARES', '0') == '1'
+PREPARE_THRESHOLD = None if DB_DISABLE_PREPARES else 1
+# Seconds to wait for the pool's first connection before giving up
+POOL_OPEN_TIMEOUT = 5
+
+INSERT_DOCUMENTS_SQL = "INSERT INTO documents (id, project_id, filename, file_path, source, status, document_content) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id"
+ASYNCPG_INSERT_DOCUMENTS_SQL = "INSERT INTO documents (id, project_id, filename, file_path, source, status, document_content) VALUES ($1, $2, $3, $4, $5, $6, $7)"
+COPY_DOCUMENTS_SQL = "COPY documents (id, project_id, filename, file_path, source, status, document_content) FROM STDIN"
+
+
+def uuid4_batch(n):
+    """Return n random (version 4) UUIDs from a single os.urandom call rather
+    than one getrandom() syscall per uuid.uuid4()."""
+    raw = bytearray(os.urandom(16 * n))
+    out = []
+    for i in range(0, 16 * n, 16):
+        b = raw[i:i + 16]
+        b[6] = (b[6] & 0x0f) | 0x40  # version 4
+        b[8] = (b[8] & 0x3f) | 0x80  # RFC 4122 variant
+        out.append(uuid.UUID(bytes=bytes(b)))
+    return out
+
+
+def insert_documents(cur, rows):
+    """Insert document rows (7-tuples) and return their ids in row order.
+    psycopg pipelines executemany, so the rows and their RETURNING results
+    travel without waiting for a reply per row."""
+    if not rows:
+        return []
+    cur.executemany(INSERT_DOCUMENTS_SQL, rows, returning=True)
+    ids = []
+    while True:
+        ids.append(cur.fetchone()[0])
+        if not cur.nextset():
+            return ids
+
+
+def insert_documents_prepared(cur, rows):
+    """Insert document rows one execute at a time, the shape a per-document
+    loop takes. prepare=True makes the server parse and plan the INSERT once
+    as a named prepared statement; each row then costs only Bind/Execute.
+    DB_DISABLE_PREPARES=1 turns this back into unnamed statements."""
+    prepare = not DB_DISABLE_PREPARES
+    for row in rows:
+        cur.execute(INSERT_DOCUMENTS_SQL, row, prepare=prepare)
+
+
+def bulk_insert_copy(cur, rows):
+    """Bulk load document rows with COPY FROM STDIN in a single round-trip."""
+    with cur.copy(COPY_DOCUMENTS_SQL) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+async def insert_many(conn, rows):
+    """Insert document rows over an asyncpg connection. asyncpg prepares the
+    statement once and streams every row in the binary format before reading
+    the replies. asyncpg binds strictly by column type, so project_id (TEXT)
+    must be a str."""
+    await conn.executemany(ASYNCPG_INSERT_DOCUMENTS_SQL, rows)
+
+
+async def time_insert_many(rows):
+    """Time insert_many inside a transaction that is rolled back afterwards."""
+    import asyncpg
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        tx = conn.transaction()
+        await tx.start()
+        started = time.perf_counter()
+        await insert_many(conn, rows)
+        elapsed = time.perf_counter() - started
+        await tx.rollback()
+        return elapsed
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify DB connection and document inserts.')
+    parser.add_argument('--bulk', type=int, default=0, metavar='N',
+                        help='also bulk-load N rows with a prepared loop, executemany and COPY and report throughput (rolled back)')
+    parser.add_argument('--asyncpg', action='store_true',
+                        help='with --bulk, also time an asyncpg executemany load')
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        log.error('DATABASE_URL not set')
+        sys.exit(1)
+
+    # Drivers are imported here rather than at module level so --help and argument
+    # errors do not pay for loading them
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError as e:
+        log.error('psycopg / psycopg_pool not available: %s', e)
+        sys.exit(1)
+
+    # Only check that asyncpg is installed; time_insert_many imports it
+    if args.asyncpg and importlib.util.find_spec('asyncpg') is None:
+        log.error('asyncpg not available; install it to use --asyncpg')
+        sys.exit(1)
+
+    # Unless disabled, prepare statements server-side from their second
+    # execution; pooled connections keep their prepared statements, so reusing the
+    # pool also reuses the plans.
+    connect_kwargs = {**build_dsn(DATABASE_URL), 'prepare_threshold': PREPARE_THRESHOLD}
+
+    log.info("DATABASE_URL is set: %s...", DATABASE_URL[:50])
+
+    try:
+        # Gives up after POOL_OPEN_TIMEOUT; psycopg_pool logs the underlying
+        # connection error through the logging setup above
+        with ConnectionPool(min_size=1, max_size=4, open=False, kwargs=connect_kwargs) as pool:
+            pool.open(wait=True, timeout=POOL_OPEN_TIMEOUT)
+            # The binary cursor sends and receives UUIDs/timestamps in libpq's binary format
+            with pool.connection() as conn, conn.cursor(binary=True) as cur:
+                log.info("✓ Connected to database successfully")
+                
+                # Test insert
+                # UUID objects go over the wire as 16-byte binary values; text form is
+                # only needed for the log lines
+                doc_id, project_id = uuid4_batch(2)
+                # One BEGIN/COMMIT around the insert and its verification; a failed
+                # check raises inside the block and rolls the row back
+                with conn.transaction():
+                    # The test row is throwaway, so this transaction's COMMIT does not
+                    # wait for the WAL flush; other sessions stay durable
+                    cur.execute("SET LOCAL synchronous_commit = off")
+                    # RETURNING verifies the insert in the same round-trip
+                    returned = insert_documents(cur, [
+                        (doc_id, project_id, "test_file.pdf", "https://example.com/test.pdf", "scrape", "pending", None)
+                    ])
+                    if returned != [doc_id]:
+                        raise RuntimeError(f"INSERT returned {returned}, expected [{doc_id}]")
+                log.info("✓ Successfully inserted test document with id=%s", doc_id)
+                log.info("✓ Verified: INSERT ... RETURNING gave back id=%s", returned[0])
+                
+                # Bulk load throughput check; rolled back so no test rows are left behind
+                if args.bulk:
+                    bulk_project_id, *bulk_ids = uuid4_batch(args.bulk + 1)
+                    rows = [
+                        (bulk_id, bulk_project_id, f"bulk_{i}.pdf", f"https://example.com/bulk_{i}.pdf", "scrape", "pending", None)
+                        for i, bulk_id in enumerate(bulk_ids)
+                    ]
+                    loaders = (
+                        ("prepared loop", insert_documents_prepared),
+                        ("executemany", insert_documents),
+                        ("COPY", bulk_insert_copy),
+                    )
+                    for label, loader in loaders:
+                        with conn.transaction(force_rollback=True):
+                            started = time.perf_counter()
+                            loader(cur, rows)
+                            elapsed = time.perf_counter() - started
+                        log.info("✓ %s loaded %d rows in %.3fs (%.0f rows/s), rolled back", label, len(rows), elapsed, len(rows) / elapsed)
+                    if args.asyncpg:
+                        asyncpg_rows = [(row[0], str(row[1])) + row[2:] for row in rows]
+                        elapsed = asyncio.run(time_insert_many(asyncpg_rows))
+                        log.info("✓ asyncpg loaded %d rows in %.3fs (%.0f rows/s), rolled back", len(rows), elapsed, len(rows) / elapsed)
+        
+        log.info("\n✓ All tests passed!")
+        
+    except Exception as e:
+        log.error("✗ Error: %s: %s", type(e).__name__, e)
+        sys.exit(1)
+
 
-try:
-    import psycopg2
-except Exception as e:
-    print('psycopg2 not available:', e)
-    sys.exit(1)
-
-if not DATABASE_URL:
-    print('DATABASE_URL not set')
-    sys.exit(1)
-
-print(f"DATABASE_URL is set: {DATABASE_URL[:50]}...")
-
-try:
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    print("✓ Connected to database successfully")
-    
-    # Test insert
-    doc_id = str(uuid.uuid4())
-    project_id = str(uuid.uuid4())
-    cur.execute(
-        "INSERT INTO documents (id, project_id, filename, file_path, source, status, document_content) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-        (doc_id, project_id, "test_file.pdf", "https://example.com/test.pdf", "scrape", "pending", None)
-    )
-    conn.commit()
-    print(f"✓ Successfully inserted test document with id={doc_id}")
-    
-    # Verify it was inserted
-    cur.execute("SELECT COUNT(*) FROM documents WHERE id = %s", (doc_id,))
-    count = cur.fetchone()[0]
-    print(f"✓ Verified: {count} row(s) found with id={doc_id}")
-    
-    cur.close()
-    conn.close()
-    print("\n✓ All tests passed!")
-    
-except Exception as e:
-    print(f"✗ Error: {type(e).__name__}: {str(e)}")
-    sys.exit(1)
+if __name__ == '__main__':
+    main()